@@ -8,12 +8,14 @@ import logging
 import os
 import shutil
 import warnings
+from collections import deque
 from os.path import abspath, basename, dirname, exists, realpath, relpath
 from os.path import join as pjoin
 from pathlib import Path
 from subprocess import PIPE, Popen
 from typing import (
     Callable,
+    Deque,
     Dict,
     FrozenSet,
     Iterable,
@@ -27,7 +29,9 @@ from typing import (
 )
 
 from .libsana import (
+    _SYSTEM_LIB_PREFIXES,
     _allow_all,
+    _update_tree_libs,
     get_rp_stripper,
     stripped_lib_dict,
     tree_libs,
@@ -35,12 +39,13 @@ from .libsana import (
 )
 from .tmpdirs import TemporaryDirectory
 from .tools import (
+    _copy_file,
     _remove_absolute_rpaths,
     dir2zip,
     find_package_dirs,
     get_archs,
     set_install_id,
-    set_install_name,
+    set_install_names,
     validate_signature,
     zip2dir,
 )
@@ -192,26 +197,25 @@ def _copy_required_libs(
     needs_delocating : set of str
         A set of the destination files, these need to be delocated.
     """
-    # Create a copy of lib_dict for this script to modify and return.
-    out_lib_dict = _copy_lib_dict(lib_dict)
-    del lib_dict
+    old2new: Dict[Text, Text] = {}  # Maps copied libraries to their copies.
     needs_delocating = set()  # Set[Text]
     for old_path in libraries_to_copy:
         new_path = realpath(pjoin(lib_path, basename(old_path)))
         logger.info(
             "Copying library %s to %s", old_path, relpath(new_path, root_path)
         )
-        shutil.copy(old_path, new_path)
+        _copy_file(old_path, new_path)
         # Delocate this file now that it is stored locally.
         needs_delocating.add(new_path)
-        # Update out_lib_dict with the new file paths.
-        out_lib_dict[new_path] = out_lib_dict[old_path]
-        del out_lib_dict[old_path]
-        for required in out_lib_dict:
-            if old_path not in out_lib_dict[required]:
-                continue
-            out_lib_dict[required][new_path] = out_lib_dict[required][old_path]
-            del out_lib_dict[required][old_path]
+        old2new[old_path] = new_path
+    # Make a copy of lib_dict with the new file paths in a single pass.
+    out_lib_dict = {
+        old2new.get(required, required): {
+            old2new.get(requiring, requiring): install_name
+            for requiring, install_name in requirings.items()
+        }
+        for required, requirings in lib_dict.items()
+    }
     return out_lib_dict, needs_delocating
 
 
@@ -221,10 +225,17 @@ def _update_install_names(
     files_to_delocate: Iterable[Text],
 ) -> None:
     """Update the install names of libraries."""
+    # Many requiring files share a few directories, split each path once.
+    requiring_dirs: Dict[Text, Text] = {}
+    # Install name changes per requiring file, applied in one call per file.
+    changes: Dict[Text, Dict[Text, Text]] = {}
     for required in files_to_delocate:
         # Set relative path for local library
         for requiring, orig_install_name in lib_dict[required].items():
-            req_rel = relpath(required, dirname(requiring))
+            requiring_dir = requiring_dirs.get(requiring)
+            if requiring_dir is None:
+                requiring_dir = requiring_dirs[requiring] = dirname(requiring)
+            req_rel = relpath(required, requiring_dir)
             new_install_name = "@loader_path/" + req_rel
             if orig_install_name == new_install_name:
                 logger.info(
@@ -240,7 +251,11 @@ def _update_install_names(
                     orig_install_name,
                     new_install_name,
                 )
-                set_install_name(requiring, orig_install_name, new_install_name)
+                changes.setdefault(requiring, {})[
+                    orig_install_name
+                ] = new_install_name
+    for requiring, requiring_changes in changes.items():
+        set_install_names(requiring, requiring_changes)
 
 
 def copy_recurse(
@@ -253,9 +268,9 @@ def copy_recurse(
     `lib_path` is a directory containing libraries.  The libraries might
     themselves have dependencies.  This function analyzes the dependencies and
     copies library dependencies that match the filter `copy_filt_func`. It also
-    adjusts the depending libraries to use the copy. It keeps iterating over
-    `lib_path` until all matching dependencies (of dependencies of dependencies
-    ...) have been copied.
+    adjusts the depending libraries to use the copy. Each newly copied library
+    is then analyzed in turn, until all matching dependencies (of dependencies
+    of dependencies ...) have been copied.
 
     Parameters
     ----------
@@ -294,11 +309,9 @@ def copy_recurse(
         copied_libs = {}
     else:
         copied_libs = dict(copied_libs)
-    done = False
-    while not done:
-        in_len = len(copied_libs)
-        _copy_required(lib_path, copy_filt_func, copied_libs)
-        done = len(copied_libs) == in_len
+    # Only libraries copied by the previous step can add new dependencies.
+    pending = deque(_copy_required(lib_path, copy_filt_func, copied_libs))
+    _copy_required_incremental(lib_path, copy_filt_func, copied_libs, pending)
     return copied_libs
 
 
@@ -306,13 +319,13 @@ def _copy_required(
     lib_path: Text,
     copy_filt_func: Optional[Callable[[Text], bool]],
     copied_libs: Dict[Text, Dict[Text, Text]],
-) -> None:
+) -> List[Text]:
     """Copy libraries required for files in `lib_path` to `copied_libs`
 
     Augment `copied_libs` dictionary with any newly copied libraries, modifying
     `copied_libs` in-place - see Notes.
 
-    This is one pass of ``copy_recurse``
+    This is the first pass of ``copy_recurse``
 
     Parameters
     ----------
@@ -325,6 +338,11 @@ def _copy_required(
     copied_libs : dict
         See :func:`copy_recurse` for definition.
 
+    Returns
+    -------
+    new_copies : list of str
+        Canonical paths of the libraries newly copied into `lib_path`.
+
     Notes
     -----
     If we need to copy another library, add that (``depended_lib_path``,
@@ -364,6 +382,92 @@ def _copy_required(
     # Map library paths after copy ('copied') to path before copy ('orig')
     rp_lp = realpath(lib_path)
     copied2orig = dict((pjoin(rp_lp, basename(c)), c) for c in copied_libs)
+    return _copy_required_from_lib_dict(
+        lib_dict, lib_path, copy_filt_func, copied_libs, copied2orig
+    )
+
+
+def _copy_required_incremental(
+    lib_path: Text,
+    copy_filt_func: Optional[Callable[[Text], bool]],
+    copied_libs: Dict[Text, Dict[Text, Text]],
+    pending: Deque[Text],
+) -> None:
+    """Copy libraries required by the `pending` libraries in `lib_path`
+
+    Libraries are analyzed one at a time in the order they were queued.  Each
+    newly copied library is appended to `pending`, so that every library in
+    `lib_path` is inspected once, instead of re-analyzing all of `lib_path`
+    until no more libraries are copied.  Libraries that depend on each other
+    in a cycle are valid; the traversal still ends, because libraries already
+    in `copied_libs` are never copied or queued again.
+
+    Parameters
+    ----------
+    lib_path : str
+        Directory containing libraries
+    copy_filt_func : None or callable, optional
+        If None, copy any library that found libraries depend on.  If callable,
+        called on each library name; copy where ``copy_filt_func(libname)`` is
+        True, don't copy otherwise
+    copied_libs : dict
+        See :func:`copy_recurse` for definition.  Modified in-place.
+    pending : deque of str
+        Canonical paths of libraries in `lib_path` which have not yet been
+        analyzed.  Consumed in-place.
+    """
+    rp_lp = realpath(lib_path)
+    copied2orig = dict((pjoin(rp_lp, basename(c)), c) for c in copied_libs)
+    unresolved_realpaths: Dict[Text, Text] = {}
+    while pending:
+        depending_path = pending.popleft()
+        lib_dict: Dict[Text, Dict[Text, Text]] = {}
+        _update_tree_libs(
+            lib_dict, depending_path, _allow_all, unresolved_realpaths
+        )
+        pending.extend(
+            _copy_required_from_lib_dict(
+                lib_dict, lib_path, copy_filt_func, copied_libs, copied2orig
+            )
+        )
+
+
+def _copy_required_from_lib_dict(
+    lib_dict: Mapping[Text, Mapping[Text, Text]],
+    lib_path: Text,
+    copy_filt_func: Optional[Callable[[Text], bool]],
+    copied_libs: Dict[Text, Dict[Text, Text]],
+    copied2orig: Dict[Text, Text],
+) -> List[Text]:
+    """Copy libraries required by the files of `lib_dict` into `lib_path`
+
+    Shared step of :func:`_copy_required` and
+    :func:`_copy_required_incremental`.
+
+    Parameters
+    ----------
+    lib_dict : dict
+        See :func:`libsana.tree_libs` for definition.  The requiring files
+        are in `lib_path`.
+    lib_path : str
+        Directory containing libraries
+    copy_filt_func : None or callable
+        See :func:`copy_recurse`.
+    copied_libs : dict
+        See :func:`copy_recurse` for definition.  Modified in-place.
+    copied2orig : dict
+        Maps canonical paths of copies in `lib_path` to the canonical path of
+        the original library.  Modified in-place.
+
+    Returns
+    -------
+    new_copies : list of str
+        Canonical paths of the libraries newly copied into `lib_path`.
+    """
+    rp_lp = realpath(lib_path)
+    new_copies = []
+    # Install name changes per requiring file, applied in one call per file.
+    changes: Dict[Text, Dict[Text, Text]] = {}
     for required, requirings in lib_dict.items():
         if copy_filt_func is not None and not copy_filt_func(required):
             continue
@@ -371,16 +475,16 @@ def _copy_required(
             # May have been processed by us, or have some rpath, loader_path of
             # its own. Either way, leave alone
             continue
+        required_base = basename(required)
+        new_install_name = "@loader_path/" + required_base
         # Requiring names may well be the copies in lib_path.  Replace the copy
         # names with the original names for entry into `copied_libs`
         procd_requirings = {}
         # Set requiring lib install names to point to local copy
         for requiring, orig_install_name in requirings.items():
-            set_install_name(
-                requiring,
-                orig_install_name,
-                "@loader_path/" + basename(required),
-            )
+            changes.setdefault(requiring, {})[
+                orig_install_name
+            ] = new_install_name
             # Make processed version of ``dependings_dict``
             mapped_requiring = copied2orig.get(requiring, requiring)
             procd_requirings[mapped_requiring] = orig_install_name
@@ -389,20 +493,31 @@ def _copy_required(
             copied_libs[required].update(procd_requirings)
             continue
         # Haven't see this one before, add entry to copied_libs
-        out_path = pjoin(lib_path, basename(required))
+        out_path = pjoin(lib_path, required_base)
         if exists(out_path):
             raise DelocationError(out_path + " already exists")
-        shutil.copy(required, lib_path)
-        copied2orig[out_path] = required
+        _copy_file(required, out_path)
+        rp_out_path = pjoin(rp_lp, required_base)
+        copied2orig[rp_out_path] = required
         copied_libs[required] = procd_requirings
+        new_copies.append(rp_out_path)
+    # The requiring files are in `lib_path`, the copied libraries are not, so
+    # changing install names after copying does not change the copies.
+    for requiring, requiring_changes in changes.items():
+        set_install_names(requiring, requiring_changes)
+    return new_copies
+
+
+_DYLIB_SUFFIXES = (".so", ".dylib")
+"""File extensions of dynamic libraries."""
 
 
 def _dylibs_only(filename: str) -> bool:
-    return filename.endswith(".so") or filename.endswith(".dylib")
+    return filename.endswith(_DYLIB_SUFFIXES)
 
 
 def filter_system_libs(libname: str) -> bool:
-    return not (libname.startswith("/usr/lib") or libname.startswith("/System"))
+    return not libname.startswith(_SYSTEM_LIB_PREFIXES)
 
 
 def _delocate_filter_function(
@@ -425,6 +540,8 @@ def delocate_path(
     ignore_missing: bool = False,
     *,
     sanitize_rpaths: bool = False,
+    walked_files: Optional[List[Text]] = None,
+    skip_dirs: Iterable[Text] = ("__pycache__", ".git"),
 ) -> Dict[Text, Dict[Text, Text]]:
     """Copy required libraries for files in `tree_path` into `lib_path`
 
@@ -453,6 +570,13 @@ def delocate_path(
         Continue even if missing dependencies are detected.
     sanitize_rpaths : bool, default=False, keyword-only
         If True, absolute paths in rpaths of binaries are removed.
+    walked_files : None or list of str, optional, keyword-only
+        If not None, the path of every file found in `tree_path` before
+        copying libraries is appended to this list.
+    skip_dirs : iterable of str, optional, keyword-only
+        Names of subdirectories of `tree_path` whose files are not inspected
+        for dependencies, unless other libraries depend on them.  Defaults to
+        ``__pycache__`` and ``.git``, which never contain libraries.
 
     Returns
     -------
@@ -493,6 +617,8 @@ def delocate_path(
         copy_filt_func=filt_func,
         executable_path=executable_path,
         ignore_missing=ignore_missing,
+        walked_files=walked_files,
+        skip_dirs=skip_dirs,
     )
 
     return delocate_tree_libs(
@@ -500,15 +626,6 @@ def delocate_path(
     )
 
 
-def _copy_lib_dict(
-    lib_dict: Mapping[Text, Mapping[Text, Text]],
-) -> Dict[Text, Dict[Text, Text]]:
-    """Returns a copy of lib_dict."""
-    return {  # Convert nested Mapping types into nested Dict types.
-        required: dict(requiring) for required, requiring in lib_dict.items()
-    }
-
-
 def _decide_dylib_bundle_directory(
     wheel_dir: str, package_name: str, lib_sdir: str = ".dylibs"
 ) -> str:
@@ -590,6 +707,7 @@ def delocate_wheel(
     executable_path: Optional[str] = None,
     ignore_missing: bool = False,
     sanitize_rpaths: bool = False,
+    skip_dirs: Iterable[str] = ("__pycache__", ".git"),
 ) -> Dict[str, Dict[str, str]]:
     """Update wheel by copying required libraries to `lib_sdir` in wheel
 
@@ -637,6 +755,12 @@ def delocate_wheel(
         Continue even if missing dependencies are detected.
     sanitize_rpaths : bool, default=False, keyword-only
         If True, absolute paths in rpaths of binaries are removed.
+    skip_dirs : iterable of str, optional, keyword-only
+        Names of subdirectories of the wheel whose files are not inspected for
+        dependencies, unless other libraries depend on them.  All files are
+        still recorded in RECORD.  Defaults to ``__pycache__`` and ``.git``.
+        The name of `lib_sdir` is always skipped as well, so that libraries
+        bundled by an earlier run are not analyzed again.
 
     Returns
     -------
@@ -672,6 +796,8 @@ def delocate_wheel(
         )
         lib_path = pjoin(wheel_dir, lib_sdir)
         lib_path_exists_before_delocate = exists(lib_path)
+        # Reuse the walk of the wheel tree when rewriting RECORD.
+        wheel_files: List[str] = []
         copied_libs = delocate_path(
             wheel_dir,
             lib_path,
@@ -680,6 +806,10 @@ def delocate_wheel(
             executable_path=executable_path,
             ignore_missing=ignore_missing,
             sanitize_rpaths=sanitize_rpaths,
+            walked_files=wheel_files,
+            # Libraries already bundled by an earlier run are only analyzed
+            # as dependencies of other files.
+            skip_dirs=(*skip_dirs, basename(lib_sdir)),
         )
         if copied_libs and lib_path_exists_before_delocate:
             raise DelocationError(
@@ -703,7 +833,7 @@ def delocate_wheel(
             libraries=libraries_in_lib_path,
             install_id_prefix=DLC_PREFIX + relpath(lib_sdir, wheel_dir),
         )
-        rewrite_record(wheel_dir)
+        rewrite_record(wheel_dir, wheel_files + libraries_in_lib_path)
         if len(copied_libs) or not in_place:
             dir2zip(wheel_dir, out_wheel)
     return stripped_lib_dict(copied_libs, wheel_dir + os.path.sep)
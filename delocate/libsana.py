@@ -1,13 +1,17 @@
 """ Analyze libraries in trees
 
 Analyze library dependencies in paths and wheel files
+
+Dependencies are reported as a ``lib_dict``, a dict of dicts mapping each
+depended-on library path to ``{depending_path: install_name, ...}``.
 """
 
 import logging
 import os
 import sys
 import warnings
-from os.path import basename, dirname, realpath
+from concurrent.futures import ThreadPoolExecutor
+from os.path import basename, dirname, realpath, relpath
 from os.path import join as pjoin
 from typing import (
     Callable,
@@ -25,6 +29,8 @@ import delocate.delocating
 
 from .tmpdirs import TemporaryDirectory
 from .tools import (
+    _get_install_names_rpaths_macholib,
+    _walk_file_entries,
     get_environment_variable_paths,
     get_install_names,
     get_rpaths,
@@ -40,14 +46,68 @@ class DependencyNotFound(Exception):
     """
 
 
+_SYSTEM_LIB_PREFIXES = ("/usr/lib", "/System")
+"""Path prefixes of libraries provided by macOS."""
+
+
 def _filter_system_libs(libname: Text) -> bool:
-    return not (libname.startswith("/usr/lib") or libname.startswith("/System"))
+    return not libname.startswith(_SYSTEM_LIB_PREFIXES)
+
+
+_InstallNamesCache = Dict[Text, Tuple[Tuple[Text, ...], Tuple[Text, ...]]]
+"""Maps library paths to their install names and rpaths during an analysis."""
+
+
+def _get_install_names_rpaths_cached(
+    filename: Text, cache: Optional[_InstallNamesCache]
+) -> Tuple[Tuple[Text, ...], Tuple[Text, ...]]:
+    """Return the install names and rpaths of `filename`, memoized in `cache`.
+
+    Both are read in-process from a single parse with ``macholib`` when it is
+    installed, falling back to :func:`get_install_names` and
+    :func:`get_rpaths`.
+
+    `cache` only lives for a single analysis of a tree, during which files are
+    not modified.  It must not be kept longer: a file replaced at the same
+    path can have the same size, modification time and even inode as the
+    original.
+
+    Parameters
+    ----------
+    filename : str
+        filename of library.  Must be an existing file.
+    cache : None or dict
+        Install names and rpaths already read during this analysis, updated
+        in-place.  If None, they are always read.
+
+    Returns
+    -------
+    install_names : tuple
+        tuple of install names for library `filename`
+    rpaths : tuple
+        tuple of rpaths for library `filename`
+    """
+    if cache is not None:
+        install_names_rpaths = cache.get(filename)
+        if install_names_rpaths is not None:
+            return install_names_rpaths
+    install_names_rpaths = _get_install_names_rpaths_macholib(filename)
+    if install_names_rpaths is None:
+        install_names_rpaths = (
+            get_install_names(filename),
+            get_rpaths(filename),
+        )
+    if cache is not None:
+        cache[filename] = install_names_rpaths
+    return install_names_rpaths
 
 
 def get_dependencies(
     lib_fname: Text,
     executable_path: Optional[Text] = None,
     filt_func: Callable[[str], bool] = lambda filepath: True,
+    *,
+    _cache: Optional[_InstallNamesCache] = None,
 ) -> Iterator[Tuple[Optional[Text], Text]]:
     """Find and yield the real paths of dependencies of the library `lib_fname`
 
@@ -98,8 +158,9 @@ def get_dependencies(
             )
             return
         raise DependencyNotFound(lib_fname)
-    rpaths = get_rpaths(lib_fname) + get_environment_variable_paths()
-    for install_name in get_install_names(lib_fname):
+    install_names, rpaths = _get_install_names_rpaths_cached(lib_fname, _cache)
+    rpaths += get_environment_variable_paths()
+    for install_name in install_names:
         try:
             if install_name.startswith("@"):
                 dependency_path = resolve_dynamic_paths(
@@ -141,6 +202,8 @@ def walk_library(
     filt_func: Callable[[Text], bool] = lambda filepath: True,
     visited: Optional[Set[Text]] = None,
     executable_path: Optional[Text] = None,
+    *,
+    _cache: Optional[_InstallNamesCache] = None,
 ) -> Iterator[Text]:
     """
     Yield all libraries on which `lib_fname` depends, directly or indirectly.
@@ -173,6 +236,8 @@ def walk_library(
         The path of each library depending on `lib_fname`, including
         `lib_fname`, without duplicates.
     """
+    if _cache is None:
+        _cache = {}  # Install names and rpaths read during this walk.
     if visited is None:
         visited = {lib_fname}
     elif lib_fname in visited:
@@ -184,7 +249,10 @@ def walk_library(
         return
     yield lib_fname
     for dependency_fname, install_name in get_dependencies(
-        lib_fname, executable_path=executable_path, filt_func=filt_func
+        lib_fname,
+        executable_path=executable_path,
+        filt_func=filt_func,
+        _cache=_cache,
     ):
         if dependency_fname is None:
             logger.error(
@@ -198,6 +266,7 @@ def walk_library(
             filt_func=filt_func,
             visited=visited,
             executable_path=executable_path,
+            _cache=_cache,
         ):
             yield sub_dependency
 
@@ -206,6 +275,10 @@ def walk_directory(
     root_path: Text,
     filt_func: Callable[[Text], bool] = lambda filepath: True,
     executable_path: Optional[Text] = None,
+    *,
+    walked_files: Optional[List[Text]] = None,
+    skip_dirs: Iterable[Text] = (),
+    _cache: Optional[_InstallNamesCache] = None,
 ) -> Iterator[Text]:
     """Walk along dependencies starting with the libraries within `root_path`.
 
@@ -224,6 +297,15 @@ def walk_directory(
     executable_path : None or str, optional
         If not None, an alternative path to use for resolving
         `@executable_path`.
+    walked_files : None or list of str, optional, keyword-only
+        If not None, the path of every file found under the canonical
+        `root_path` is appended to this list, so that callers can reuse the
+        walk of the tree.
+    skip_dirs : iterable of str, optional, keyword-only
+        Names of subdirectories of `root_path`, such as ``"__pycache__"``,
+        whose files are not analyzed as libraries.  Libraries in these
+        directories are still analyzed when they are dependencies of other
+        libraries, and their files are still added to `walked_files`.
 
     Yields
     ------
@@ -232,20 +314,84 @@ def walk_directory(
         dependencies without any duplicates.
     """
     visited_paths: Set[Text] = set()
-    for dirpath, dirnames, basenames in os.walk(root_path):
-        for base in basenames:
-            depending_path = realpath(pjoin(dirpath, base))
-            if depending_path in visited_paths:
-                continue  # A library in root_path was a dependency of another.
-            if not filt_func(depending_path):
+    depending_paths = [
+        depending_path
+        for depending_path in _walk_realpaths(
+            root_path, walked_files, skip_dirs
+        )
+        if filt_func(depending_path)
+    ]
+    if _cache is None:
+        _cache = {}  # Install names and rpaths read during this walk.
+    _prefetch_install_names(depending_paths, _cache)
+    for depending_path in depending_paths:
+        if depending_path in visited_paths:
+            continue  # A library in root_path was a dependency of another.
+        for library_path in walk_library(
+            depending_path,
+            filt_func=filt_func,
+            visited=visited_paths,
+            executable_path=executable_path,
+            _cache=_cache,
+        ):
+            yield library_path
+
+
+def _walk_realpaths(
+    root_path: Text,
+    walked_files: Optional[List[Text]] = None,
+    skip_dirs: Iterable[Text] = (),
+) -> Iterator[Text]:
+    """Yield the canonical path of each file in the tree of `root_path`.
+
+    The unresolved path of each file is also appended to `walked_files` if it
+    is not None.  Files below a subdirectory named in `skip_dirs` are added to
+    `walked_files` but not yielded.
+    """
+    rp_root = realpath(root_path)
+    skip_names = frozenset(skip_dirs)
+    # Whether files in each directory are skipped, computed once per directory.
+    skipped_dirs: Dict[Text, bool] = {}
+    # Only real directories are walked below the canonical root, so only
+    # symlinked files need to be resolved.
+    for entry in _walk_file_entries(rp_root):
+        if walked_files is not None:
+            walked_files.append(entry.path)
+        if skip_names:
+            dir_path = dirname(entry.path)
+            skipped = skipped_dirs.get(dir_path)
+            if skipped is None:
+                rel_dir = relpath(dir_path, rp_root)
+                skipped = not skip_names.isdisjoint(rel_dir.split(os.sep))
+                skipped_dirs[dir_path] = skipped
+            if skipped:
                 continue
-            for library_path in walk_library(
-                depending_path,
-                filt_func=filt_func,
-                visited=visited_paths,
-                executable_path=executable_path,
-            ):
-                yield library_path
+        yield realpath(entry.path) if entry.is_symlink() else entry.path
+
+
+def _prefetch_install_names(
+    filenames: Iterable[Text], cache: _InstallNamesCache
+) -> None:
+    """Read the install names and rpaths of `filenames` into `cache`.
+
+    Without ``macholib`` each file needs ``otool`` subprocesses, which release
+    the GIL while waiting, so the reads are spread over a thread pool.  With
+    ``macholib`` the pool still overlaps reading the files from disk.
+
+    Errors are ignored here, they are raised again when the install names of
+    the file are requested.
+    """
+
+    def prefetch(filename: Text) -> None:
+        try:
+            _get_install_names_rpaths_cached(filename, cache)
+        except Exception:
+            pass
+
+    max_workers = min(32, (os.cpu_count() or 1) * 4)
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        for _ in executor.map(prefetch, filenames):
+            pass
 
 
 def _tree_libs_from_libraries(
@@ -255,6 +401,7 @@ def _tree_libs_from_libraries(
     copy_filt_func: Callable[[str], bool],
     executable_path: Optional[str] = None,
     ignore_missing: bool = False,
+    cache: Optional[_InstallNamesCache] = None,
 ) -> Dict[str, Dict[str, str]]:
     """Return an analysis of the dependencies of `libraries`.
 
@@ -275,6 +422,8 @@ def _tree_libs_from_libraries(
         `@executable_path`.
     ignore_missing : bool, default=False, optional, keyword-only
         Continue even if missing dependencies are detected.
+    cache : None or dict, optional, keyword-only
+        Install names already read during this analysis, updated in-place.
 
     Returns
     -------
@@ -305,6 +454,7 @@ def _tree_libs_from_libraries(
             library_path,
             executable_path=executable_path,
             filt_func=lib_filt_func,
+            _cache=cache,
         ):
             if depending_path is None:
                 missing_libs = True
@@ -331,6 +481,8 @@ def tree_libs_from_directory(
     copy_filt_func: Callable[[str], bool] = lambda path: True,
     executable_path: Optional[str] = None,
     ignore_missing: bool = False,
+    walked_files: Optional[List[Text]] = None,
+    skip_dirs: Iterable[Text] = (),
 ) -> Dict[Text, Dict[Text, Text]]:
     """Return an analysis of the libraries in the directory of `start_path`.
 
@@ -353,6 +505,12 @@ def tree_libs_from_directory(
         `@executable_path`.
     ignore_missing : bool, default=False, optional, keyword-only
         Continue even if missing dependencies are detected.
+    walked_files : None or list of str, optional, keyword-only
+        If not None, the path of every file found under `start_path` is
+        appended to this list.  See :func:`walk_directory`.
+    skip_dirs : iterable of str, optional, keyword-only
+        Names of subdirectories of `start_path` whose files are not analyzed
+        as libraries.  See :func:`walk_directory`.
 
     Returns
     -------
@@ -376,13 +534,21 @@ def tree_libs_from_directory(
         When any dependencies can not be located and ``ignore_missing`` is
         False.
     """
+    # Install names and rpaths read while walking are reused here.
+    cache: _InstallNamesCache = {}
     return _tree_libs_from_libraries(
         walk_directory(
-            start_path, lib_filt_func, executable_path=executable_path
+            start_path,
+            lib_filt_func,
+            executable_path=executable_path,
+            walked_files=walked_files,
+            skip_dirs=skip_dirs,
+            _cache=cache,
         ),
         lib_filt_func=lib_filt_func,
         copy_filt_func=copy_filt_func,
         ignore_missing=ignore_missing,
+        cache=cache,
     )
 
 
@@ -443,30 +609,67 @@ def tree_libs(
     if filt_func is None:
         filt_func = _allow_all
     lib_dict: Dict[Text, Dict[Text, Text]] = {}
-    for dirpath, dirnames, basenames in os.walk(start_path):
-        for base in basenames:
-            depending_path = realpath(pjoin(dirpath, base))
-            for dependency_path, install_name in get_dependencies(
-                depending_path,
-                filt_func=filt_func,
-            ):
-                if dependency_path is None:
-                    # Mimic deprecated behavior.
-                    # A lib_dict with unresolved paths is unsuitable for
-                    # delocating, this is a missing dependency.
-                    dependency_path = realpath(install_name)
-                if install_name.startswith("@loader_path/"):
-                    # Support for `@loader_path` would break existing callers.
-                    logger.debug(
-                        "Excluding %s because it has '@loader_path'.",
-                        install_name,
-                    )
-                    continue
-                lib_dict.setdefault(dependency_path, {})
-                lib_dict[dependency_path][depending_path] = install_name
+    # Real paths of unresolved install names, shared by all depending files.
+    unresolved_realpaths: Dict[Text, Text] = {}
+    cache: _InstallNamesCache = {}
+    depending_paths = list(_walk_realpaths(start_path))
+    _prefetch_install_names(filter(filt_func, depending_paths), cache)
+    for depending_path in depending_paths:
+        _update_tree_libs(
+            lib_dict, depending_path, filt_func, unresolved_realpaths, cache
+        )
     return lib_dict
 
 
+def _update_tree_libs(
+    lib_dict: Dict[Text, Dict[Text, Text]],
+    depending_path: Text,
+    filt_func: Callable[[Text], bool],
+    unresolved_realpaths: Dict[Text, Text],
+    cache: Optional[_InstallNamesCache] = None,
+) -> None:
+    """Add the dependencies of `depending_path` to `lib_dict` in-place.
+
+    This is the per-file step of the deprecated :func:`tree_libs`.
+
+    Parameters
+    ----------
+    lib_dict : dict
+        See :func:`tree_libs` for definition.  Modified in-place.
+    depending_path : str
+        Canonical (``os.path.realpath``) filename of the file to inspect.
+    filt_func : callable
+        Accepts filename as argument, returns True if we should inspect the
+        file, False otherwise.
+    unresolved_realpaths : dict
+        Cache of ``os.path.realpath`` for install names which could not be
+        resolved.  Modified in-place.
+    cache : None or dict, optional
+        Install names already read during this analysis, updated in-place.
+    """
+    for dependency_path, install_name in get_dependencies(
+        depending_path,
+        filt_func=filt_func,
+        _cache=cache,
+    ):
+        if dependency_path is None:
+            # Mimic deprecated behavior.
+            # A lib_dict with unresolved paths is unsuitable for
+            # delocating, this is a missing dependency.
+            if install_name not in unresolved_realpaths:
+                unresolved_realpaths[install_name] = realpath(install_name)
+            dependency_path = unresolved_realpaths[install_name]
+        if install_name.startswith("@loader_path/"):
+            # Support for `@loader_path` would break existing callers.
+            logger.debug(
+                "Excluding %s because it has '@loader_path'.",
+                install_name,
+            )
+            continue
+        lib_dict.setdefault(dependency_path, {})
+        lib_dict[dependency_path][depending_path] = install_name
+
+
 _default_paths_to_search = ("/usr/local/lib", "/usr/lib")
 
 
@@ -620,6 +823,7 @@ def search_environment_for_lib(lib_path: Text) -> Text:
         ``realpath(lib_path)`` if it cannot.
     """
     lib_basename = basename(lib_path)
+    rp_lib_path = realpath(lib_path)
     potential_library_locations = []
 
     # 1. Search on DYLD_LIBRARY_PATH
@@ -628,7 +832,7 @@ def search_environment_for_lib(lib_path: Text) -> Text:
     )
 
     # 2. Search for realpath(lib_path)
-    potential_library_locations.append(realpath(lib_path))
+    potential_library_locations.append(rp_lib_path)
 
     # 3. Search on DYLD_FALLBACK_LIBRARY_PATH
     potential_library_locations += _paths_from_var(
@@ -637,9 +841,11 @@ def search_environment_for_lib(lib_path: Text) -> Text:
 
     for location in potential_library_locations:
         if os.path.exists(location):
+            if location == rp_lib_path:
+                return rp_lib_path  # Already canonical.
             # See GH#133 for why we return the realpath here if it can be found
             return realpath(location)
-    return realpath(lib_path)
+    return rp_lib_path
 
 
 def get_prefix_stripper(strip_prefix: Text) -> Callable[[Text], Text]:
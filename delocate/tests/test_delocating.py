@@ -9,12 +9,25 @@ import sys
 from collections import namedtuple
 from os.path import basename, dirname, realpath, relpath, splitext
 from os.path import join as pjoin
-from typing import Any, Callable, Dict, Iterable, List, Set, Text, Tuple
+from pathlib import Path
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    List,
+    Optional,
+    Set,
+    Text,
+    Tuple,
+)
+from unittest import mock
 
 import pytest
 
 from ..delocating import (
     DelocationError,
+    _copy_required_libs,
     bads_report,
     check_archs,
     copy_recurse,
@@ -227,6 +240,89 @@ def _copy_to(fname: str, directory: str, new_base: str) -> str:
     return new_name
 
 
+def test_copy_required_libs(tmp_path) -> None:
+    root = tmp_path / "root"
+    lib_path = root / "libs"
+    lib_path.mkdir(parents=True)
+    ext = tmp_path / "ext"
+    ext.mkdir()
+    liba = ext / "liba.dylib"
+    libb = ext / "libb.dylib"
+    liba.write_bytes(b"liba")
+    libb.write_bytes(b"libb")
+    module = realpath(root / "module.so")
+    new_liba = realpath(lib_path / "liba.dylib")
+    new_libb = realpath(lib_path / "libb.dylib")
+    lib_dict = {
+        str(liba): {str(libb): "liba.dylib", module: str(liba)},
+        str(libb): {module: str(libb)},
+        "/usr/lib/libSystem.B.dylib": {str(liba): "libSystem.B.dylib"},
+    }
+    out_lib_dict, needs_delocating = _copy_required_libs(
+        lib_dict, str(lib_path), str(root), [str(liba), str(libb)]
+    )
+    assert out_lib_dict == {
+        new_liba: {new_libb: "liba.dylib", module: str(liba)},
+        new_libb: {module: str(libb)},
+        "/usr/lib/libSystem.B.dylib": {new_liba: "libSystem.B.dylib"},
+    }
+    assert needs_delocating == {new_liba, new_libb}
+    assert (lib_path / "liba.dylib").read_bytes() == b"liba"
+    assert (lib_path / "libb.dylib").read_bytes() == b"libb"
+    # The input is not modified.
+    assert str(liba) in lib_dict
+
+
+@pytest.mark.filterwarnings("ignore:tree_libs:DeprecationWarning")
+@pytest.mark.filterwarnings("ignore:copy_recurse:DeprecationWarning")
+def test_copy_recurse_cycle(tmp_path: Path) -> None:
+    # Libraries depending on each other in a cycle are each copied once.
+    # The fake libraries store their install names as their contents.
+    def get_install_names(filename: str) -> Tuple[str, ...]:
+        return tuple(Path(filename).read_text().split())
+
+    def get_install_names_rpaths(
+        filename: str,
+        cache: Optional[Dict[str, Tuple[Tuple[str, ...], Tuple[str, ...]]]],
+    ) -> Tuple[Tuple[str, ...], Tuple[str, ...]]:
+        return get_install_names(filename), ()
+
+    def set_install_names(filename: str, changes: Dict[str, str]) -> None:
+        names = get_install_names(filename)
+        Path(filename).write_text(" ".join(changes.get(n, n) for n in names))
+
+    ext = Path(realpath(tmp_path)) / "ext"
+    lib_path = Path(realpath(tmp_path)) / "libs"
+    ext.mkdir()
+    lib_path.mkdir()
+    liba = str(ext / "liba.dylib")
+    libb = str(ext / "libb.dylib")
+    module = str(lib_path / "module.so")
+    Path(liba).write_text(libb)
+    Path(libb).write_text(liba)
+    Path(module).write_text(liba)
+    with mock.patch(
+        "delocate.libsana._get_install_names_rpaths_cached",
+        get_install_names_rpaths,
+    ), mock.patch("delocate.delocating.set_install_names", set_install_names):
+        copied_libs = copy_recurse(str(lib_path))
+    assert copied_libs == {
+        liba: {module: liba, libb: liba},
+        libb: {liba: libb},
+    }
+    assert sorted(os.listdir(lib_path)) == [
+        "liba.dylib",
+        "libb.dylib",
+        "module.so",
+    ]
+    assert Path(module).read_text() == "@loader_path/liba.dylib"
+    assert (lib_path / "liba.dylib").read_text() == "@loader_path/libb.dylib"
+    assert (lib_path / "libb.dylib").read_text() == "@loader_path/liba.dylib"
+    # The original libraries are not modified.
+    assert Path(liba).read_text() == libb
+    assert Path(libb).read_text() == liba
+
+
 @pytest.mark.xfail(sys.platform != "darwin", reason="otool")
 @pytest.mark.filterwarnings("ignore:tree_libs:DeprecationWarning")
 @pytest.mark.filterwarnings("ignore:copy_recurse:DeprecationWarning")
@@ -23,6 +23,7 @@ import pytest
 from ..tmpdirs import InTemporaryDirectory
 from ..tools import (
     InstallNameError,
+    _get_install_names_rpaths_macholib,
     add_rpath,
     get_environment_variable_paths,
     get_install_id,
@@ -31,6 +32,7 @@ from ..tools import (
     parse_install_name,
     set_install_id,
     set_install_name,
+    set_install_names,
 )
 from .env_tools import TempDirWithoutEnvVars
 from .pytest_tools import assert_equal, assert_raises
@@ -83,6 +85,25 @@ def test_get_install_names() -> None:
         assert get_install_names("test.dylib") == ()
 
 
+def test_get_install_names_rpaths_macholib() -> None:
+    pytest.importorskip("macholib")
+    read = _get_install_names_rpaths_macholib
+    assert read(LIBA) == (EXT_LIBS, ())
+    assert read(LIBB) == (("liba.dylib",) + EXT_LIBS, ())
+    assert read(LIBC) == (("liba.dylib", "libb.dylib") + EXT_LIBS, ())
+    assert read(TEST_LIB) == (("libc.dylib",) + EXT_LIBS, ())
+    assert read(LIBAM1_ARCH) == (EXT_LIBS, ())
+    # Universal binary with the same install names and rpaths for both
+    # architectures
+    assert read(pjoin(DATA_PATH, "libextfunc_rpath.dylib")) == (
+        ("@rpath/libextfunc2_rpath.dylib", LIBSYSTEMB),
+        ("@executable_path/", "@loader_path/"),
+    )
+    # Non-library files return empty tuples
+    for fname in (A_OBJECT, LIBA_STATIC, ICO_FILE, PY_FILE, BIN_FILE):
+        assert read(fname) == ((), ())
+
+
 def test_parse_install_name():
     assert_equal(
         parse_install_name(
@@ -140,6 +161,55 @@ def test_change_install_name():
         )
 
 
+@pytest.mark.xfail(sys.platform != "darwin", reason="otool")
+def test_change_install_names():
+    # Test changing several install names in library at once
+    with InTemporaryDirectory() as tmpdir:
+        libfoo = pjoin(tmpdir, "libfoo.dylib")
+        shutil.copy2(LIBB, libfoo)
+        set_install_names(
+            libfoo,
+            {"liba.dylib": "libbar.dylib", LIBSTDCXX: "@rpath/libc++.dylib"},
+        )
+        assert_equal(
+            get_install_names(libfoo),
+            ("libbar.dylib", "@rpath/libc++.dylib", LIBSYSTEMB),
+        )
+        # If any name is not found, raise an error before changing names
+        assert_raises(
+            InstallNameError,
+            set_install_names,
+            libfoo,
+            {"libbar.dylib": "libbaz.dylib", "liba.dylib": "libpho.dylib"},
+        )
+        assert_equal(get_install_names(libfoo)[0], "libbar.dylib")
+
+
+def test_set_install_names_single_call() -> None:
+    # All install names of a library are changed by one install_name_tool
+    with mock.patch(
+        "delocate.tools.get_install_names", return_value=("liba", "libb")
+    ), mock.patch("delocate.tools._run") as mock_run, mock.patch(
+        "delocate.tools.replace_signature"
+    ) as mock_sign:
+        set_install_names("libfoo", {"liba": "new_a", "libb": "new_b"})
+        set_install_names("libfoo", {})
+    mock_run.assert_called_once_with(
+        [
+            "install_name_tool",
+            "-change",
+            "liba",
+            "new_a",
+            "-change",
+            "libb",
+            "new_b",
+            "libfoo",
+        ],
+        check=True,
+    )
+    mock_sign.assert_called_once_with("libfoo", "-")
+
+
 @pytest.mark.xfail(sys.platform != "darwin", reason="otool")
 def test_set_install_id():
     # Test ability to change install id in library
@@ -9,7 +9,8 @@ import subprocess
 import sys
 from os.path import dirname, realpath, relpath, split
 from os.path import join as pjoin
-from typing import Dict, Iterable, Text
+from pathlib import Path
+from typing import Dict, Iterable, List, Text, Tuple
 from unittest import mock
 
 import pytest
@@ -17,6 +18,9 @@ import pytest
 from ..delocating import DelocationError, filter_system_libs
 from ..libsana import (
     DependencyNotFound,
+    _get_install_names_rpaths_cached,
+    _prefetch_install_names,
+    _walk_realpaths,
     get_dependencies,
     get_prefix_stripper,
     get_rp_stripper,
@@ -580,3 +584,111 @@ def test_walk_directory(tmpdir: object) -> None:
         pjoin(tmpdir, "libextfunc_rpath.dylib"),
         pjoin(DATA_PATH, "libextfunc2_rpath.dylib"),
     }
+
+
+def test_get_install_names_rpaths_cached(tmp_path: Path) -> None:
+    lib = str(tmp_path / "libfake.dylib")
+    with open(lib, "wb") as f:
+        f.write(b"1")
+    expected = (("liba.dylib",), ("@loader_path/",))
+    with mock.patch(
+        "delocate.libsana._get_install_names_rpaths_macholib",
+        return_value=None,
+    ), mock.patch(
+        "delocate.libsana.get_install_names", return_value=("liba.dylib",)
+    ) as get_install_names, mock.patch(
+        "delocate.libsana.get_rpaths", return_value=("@loader_path/",)
+    ) as get_rpaths:
+        cache: Dict[Text, Tuple[Tuple[Text, ...], Tuple[Text, ...]]] = {}
+        assert _get_install_names_rpaths_cached(lib, cache) == expected
+        assert _get_install_names_rpaths_cached(lib, cache) == expected
+        assert get_install_names.call_count == 1
+        assert get_rpaths.call_count == 1
+        assert cache == {lib: expected}
+        # Without a cache the install names and rpaths are always read.
+        assert _get_install_names_rpaths_cached(lib, None) == expected
+        assert get_install_names.call_count == 2
+        assert get_rpaths.call_count == 2
+
+
+def test_prefetch_install_names(tmp_path: Path) -> None:
+    libs = [str(tmp_path / f"lib{i}.dylib") for i in range(3)]
+    for lib in libs:
+        with open(lib, "wb") as f:
+            f.write(lib.encode())
+    missing = str(tmp_path / "missing.dylib")
+
+    def read_install_names(filename: str) -> Tuple[str, ...]:
+        with open(filename, "rb"):
+            return ("liba.dylib",)
+
+    def read_rpaths(filename: str) -> Tuple[str, ...]:
+        with open(filename, "rb"):
+            return ("@loader_path/",)
+
+    expected = (("liba.dylib",), ("@loader_path/",))
+    with mock.patch(
+        "delocate.libsana._get_install_names_rpaths_macholib",
+        return_value=None,
+    ), mock.patch(
+        "delocate.libsana.get_install_names", side_effect=read_install_names
+    ) as get_install_names, mock.patch(
+        "delocate.libsana.get_rpaths", side_effect=read_rpaths
+    ) as get_rpaths:
+        cache: Dict[Text, Tuple[Tuple[Text, ...], Tuple[Text, ...]]] = {}
+        # Errors from files which can not be read are ignored.
+        _prefetch_install_names(libs + [missing], cache)
+        assert get_install_names.call_count == 4
+        assert get_rpaths.call_count == 3
+        assert missing not in cache
+        for lib in libs:
+            assert _get_install_names_rpaths_cached(lib, cache) == expected
+        assert get_install_names.call_count == 4
+        assert get_rpaths.call_count == 3
+    # Files parsed with macholib are prefetched too.
+    with mock.patch(
+        "delocate.libsana._get_install_names_rpaths_macholib",
+        return_value=expected,
+    ) as read_macholib:
+        cache = {}
+        _prefetch_install_names(libs, cache)
+        assert read_macholib.call_count == 3
+        assert cache == {lib: expected for lib in libs}
+
+
+@pytest.mark.skipif(sys.platform == "win32", reason="Needs symlinks.")
+def test_walk_realpaths(tmp_path: Path) -> None:
+    root = tmp_path / "root"
+    (root / "sub").mkdir(parents=True)
+    (tmp_path / "outside.dylib").write_bytes(b"")
+    (root / "liba.dylib").write_bytes(b"")
+    (root / "sub" / "libb.dylib").write_bytes(b"")
+    (root / "sub" / "link.dylib").symlink_to(tmp_path / "outside.dylib")
+    (root / "link_dir").symlink_to(root / "sub")
+    (tmp_path / "root_link").symlink_to(root)
+    expected = [
+        realpath(pjoin(dirpath, fname))
+        for dirpath, dirnames, filenames in os.walk(str(root))
+        for fname in filenames
+    ]
+    assert list(_walk_realpaths(str(root))) == expected
+    assert list(_walk_realpaths(str(tmp_path / "root_link"))) == expected
+    walked_files: List[Text] = []
+    assert list(_walk_realpaths(str(root), walked_files)) == expected
+    assert walked_files == [
+        pjoin(dirpath, fname)
+        for dirpath, dirnames, filenames in os.walk(realpath(root))
+        for fname in filenames
+    ]
+    # Files below skipped directories are walked but not yielded
+    (root / "sub" / "__pycache__").mkdir()
+    (root / "sub" / "__pycache__" / "mod.pyc").write_bytes(b"")
+    skip_walked: List[Text] = []
+    assert list(
+        _walk_realpaths(str(root), skip_walked, ["__pycache__", "sub"])
+    ) == [realpath(root / "liba.dylib")]
+    assert sorted(skip_walked) == sorted(
+        pjoin(dirpath, fname)
+        for dirpath, dirnames, filenames in os.walk(realpath(root))
+        for fname in filenames
+    )
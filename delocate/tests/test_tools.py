@@ -6,14 +6,20 @@ import shutil
 import stat
 import subprocess
 import sys
+import zipfile
 from os.path import dirname
 from os.path import join as pjoin
+from unittest import mock
 
 import pytest
 
 from ..tmpdirs import InTemporaryDirectory
 from ..tools import (
+    _clonefile,
+    _copy_file,
     _is_macho_file,
+    _walk_files,
+    _zipfile_zlib_ng,
     add_rpath,
     back_tick,
     chmod_perms,
@@ -206,6 +212,51 @@ def test_zip2() -> None:
         assert os.stat(out_fname).st_mode & 0o777 == permissions
 
 
+def test_dir2zip_zlib_ng_opt_in(tmp_path, monkeypatch) -> None:
+    in_dir = tmp_path / "in_dir"
+    in_dir.mkdir()
+    (in_dir / "file.txt").write_bytes(b"contents" * 1000)
+    monkeypatch.delenv("DELOCATE_ZLIB_NG", raising=False)
+    with mock.patch(
+        "delocate.tools._zipfile_zlib_ng", wraps=_zipfile_zlib_ng
+    ) as zlib_ng_context, mock.patch("delocate.tools.zlib_ng", None):
+        # zlib is used by default
+        dir2zip(in_dir, tmp_path / "default.zip")
+        assert not zlib_ng_context.called
+        # zlib-ng is used when requested, and must be installed
+        with pytest.raises(ImportError):
+            dir2zip(in_dir, tmp_path / "arg.zip", use_zlib_ng=True)
+        assert zlib_ng_context.call_count == 1
+        monkeypatch.setenv("DELOCATE_ZLIB_NG", "1")
+        with pytest.raises(ImportError):
+            dir2zip(in_dir, tmp_path / "env.zip")
+        assert zlib_ng_context.call_count == 2
+        dir2zip(in_dir, tmp_path / "off.zip", use_zlib_ng=False)
+        assert zlib_ng_context.call_count == 2
+    with zipfile.ZipFile(tmp_path / "default.zip") as zip:
+        assert zip.read("file.txt") == b"contents" * 1000
+
+
+def test_dir2zip_zlib_ng(tmp_path) -> None:
+    zlib_ng = pytest.importorskip("zlib_ng.zlib_ng")
+    orig_zlib = zipfile.zlib  # type: ignore[attr-defined]
+    orig_crc32 = zipfile.crc32  # type: ignore[attr-defined]
+    with _zipfile_zlib_ng():
+        assert zipfile.zlib is zlib_ng  # type: ignore[attr-defined]
+        assert zipfile.crc32 is zlib_ng.crc32  # type: ignore[attr-defined]
+        assert zipfile.crc32(b"abc") == orig_crc32(b"abc")  # type: ignore
+    assert zipfile.zlib is orig_zlib  # type: ignore[attr-defined]
+    assert zipfile.crc32 is orig_crc32  # type: ignore[attr-defined]
+    in_dir = tmp_path / "in_dir"
+    in_dir.mkdir()
+    (in_dir / "file.txt").write_bytes(b"contents" * 1000)
+    dir2zip(in_dir, tmp_path / "out.zip", use_zlib_ng=True)
+    assert zipfile.zlib is orig_zlib  # type: ignore[attr-defined]
+    with zipfile.ZipFile(tmp_path / "out.zip") as zip:
+        assert zip.testzip() is None
+        assert zip.read("file.txt") == b"contents" * 1000
+
+
 def test_find_package_dirs():
     # Test utility for finding package directories
     with InTemporaryDirectory():
@@ -227,6 +278,95 @@ def test_find_package_dirs():
         assert_equal(find_package_dirs("."), {"to_test"})
 
 
+@pytest.mark.skipif(sys.platform == "win32", reason="Needs symlinks.")
+def test_walk_files(tmp_path) -> None:
+    top = str(tmp_path)
+    for sdir in ("a", pjoin("a", "b"), "c"):
+        os.mkdir(pjoin(top, sdir))
+    for fname in ("f1", pjoin("a", "f2"), pjoin("a", "b", "f3"), "g"):
+        _write_file(pjoin(top, fname), "contents")
+    os.symlink(pjoin(top, "a"), pjoin(top, "link_to_dir"))
+    os.symlink(pjoin(top, "f1"), pjoin(top, "c", "link_to_file"))
+    expected = [
+        pjoin(dirpath, fname)
+        for dirpath, dirnames, filenames in os.walk(top)
+        for fname in filenames
+    ]
+    assert list(_walk_files(top)) == expected
+    assert list(_walk_files(pjoin(top, "missing"))) == []
+
+
+@pytest.mark.skipif(sys.platform == "win32", reason="Tests Unix permissions")
+def test_copy_file(tmp_path) -> None:
+    src = str(tmp_path / "src")
+    _write_file(src, "some contents")
+    os.chmod(src, 0o750)
+    dst = str(tmp_path / "dst")
+    _copy_file(src, dst)
+    assert cmp_contents(src, dst)
+    assert chmod_perms(dst) == 0o750
+    # Existing destinations are overwritten.
+    _write_file(src, "other contents")
+    _copy_file(src, dst)
+    assert cmp_contents(src, dst)
+    # Falls back to shutil.copy if the platform copy fails.
+    fallback_dst = str(tmp_path / "fallback_dst")
+    with mock.patch("delocate.tools._clonefile", return_value=False):
+        with mock.patch("delocate.tools._copy_file_range", return_value=False):
+            _copy_file(src, fallback_dst)
+    assert cmp_contents(src, fallback_dst)
+    assert chmod_perms(fallback_dst) == 0o750
+    # Short kernel copies fall back to shutil.copy instead of truncating.
+    if hasattr(os, "copy_file_range"):
+        short_dst = str(tmp_path / "short_dst")
+        with mock.patch("delocate.tools._clonefile", return_value=False):
+            with mock.patch("os.copy_file_range", return_value=0):
+                _copy_file(src, short_dst)
+        assert cmp_contents(src, short_dst)
+    # So do Pythons without copy_file_range (< 3.8).
+    no_range_dst = str(tmp_path / "no_range_dst")
+    with mock.patch("delocate.tools._clonefile", return_value=False):
+        # Patch so that the attribute is restored after deleting it.
+        with mock.patch.object(os, "copy_file_range", create=True):
+            del os.copy_file_range
+            _copy_file(src, no_range_dst)
+    assert cmp_contents(src, no_range_dst)
+
+    # Clones get the ownership and timestamps of a new file.
+    def fake_clonefile(src_b: bytes, dst_b: bytes, flags: int) -> int:
+        shutil.copy2(src_b, dst_b)  # Also copies timestamps, like clonefile.
+        return 0
+
+    clonefile = mock.Mock(side_effect=fake_clonefile)
+    clone_dst = str(tmp_path / "clone_dst")
+    os.utime(src, (0, 0))
+    with mock.patch("delocate.tools._get_clonefile", return_value=clonefile):
+        assert _clonefile(src, clone_dst)
+    assert clonefile.call_args.args[2] == 0x0002  # CLONE_NOOWNERCOPY
+    assert cmp_contents(src, clone_dst)
+    assert os.stat(clone_dst).st_mtime > 0
+
+
+@pytest.mark.skipif(sys.platform != "darwin", reason="clonefile")
+def test_copy_file_clonefile(tmp_path) -> None:
+    # Clones match shutil.copy apart from extended attributes.
+    src = str(tmp_path / "src")
+    _write_file(src, "some contents")
+    os.chmod(src, 0o750)
+    os.utime(src, (0, 0))
+    cloned = str(tmp_path / "cloned")
+    assert _clonefile(src, cloned)
+    copied = str(tmp_path / "copied")
+    shutil.copy(src, copied)
+    assert cmp_contents(cloned, copied)
+    cloned_stat = os.stat(cloned)
+    copied_stat = os.stat(copied)
+    assert cloned_stat.st_mode == copied_stat.st_mode
+    assert cloned_stat.st_uid == copied_stat.st_uid
+    assert cloned_stat.st_gid == copied_stat.st_gid
+    assert cloned_stat.st_mtime > 0
+
+
 def test_cmp_contents():
     # Binary compare of filenames
     assert_true(cmp_contents(__file__, __file__))
@@ -13,9 +13,11 @@ from os.path import join as pjoin
 from pathlib import Path
 from subprocess import check_call
 from typing import NamedTuple
+from unittest import mock
 
 import pytest
 
+from .. import libsana
 from ..delocating import (
     DLC_PREFIX,
     DelocationError,
@@ -84,6 +86,35 @@ def test_fix_pure_python():
         assert_false(exists(pjoin("pure_pkg", "fakepkg2", ".dylibs")))
 
 
+def test_fix_skip_dirs_record(tmp_path: Path) -> None:
+    # Files in skipped directories are not analyzed but are kept in RECORD
+    wheel_dir = tmp_path / "pure_pkg"
+    zip2dir(PURE_WHEEL, wheel_dir)
+    skipped = [
+        "fakepkg2/__pycache__/module1.cpython-311.pyc",
+        "fakepkg2/.dylibs/libbundled.dylib",
+    ]
+    for name in skipped:
+        (wheel_dir / name).parent.mkdir(parents=True)
+        (wheel_dir / name).write_bytes(b"not a library")
+    in_wheel = tmp_path / basename(PURE_WHEEL)
+    dir2zip(str(wheel_dir), str(in_wheel))
+    out_wheel = tmp_path / "out" / basename(PURE_WHEEL)
+    out_wheel.parent.mkdir()
+    with mock.patch(
+        "delocate.libsana._get_install_names_rpaths_cached",
+        wraps=libsana._get_install_names_rpaths_cached,
+    ) as read_names:
+        assert delocate_wheel(str(in_wheel), str(out_wheel)) == {}
+    analyzed = {Path(call.args[0]).name for call in read_names.call_args_list}
+    assert "module1.py" in analyzed
+    assert not analyzed & {basename(name) for name in skipped}
+    with zipfile.ZipFile(out_wheel) as whl:
+        record = whl.read("fakepkg2-1.0.dist-info/RECORD").decode()
+    recorded = {line.split(",")[0] for line in record.splitlines()}
+    assert recorded.issuperset(skipped)
+
+
 def _fixed_wheel(out_path: str | Path) -> tuple[str, str]:
     wheel_base = basename(PLAT_WHEEL)
     with InGivenDirectory(out_path):
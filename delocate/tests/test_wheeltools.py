@@ -7,7 +7,9 @@ import shutil
 from email.message import Message
 from os.path import basename, exists, isfile, realpath, splitext
 from os.path import join as pjoin
+from pathlib import Path
 from typing import AnyStr, List, Tuple
+from unittest import mock
 from zipfile import ZipFile
 
 import pytest
@@ -21,6 +23,7 @@ from ..wheeltools import (
     InWheel,
     InWheelCtx,
     WheelToolsError,
+    _record_hash,
     add_platforms,
     rewrite_record,
 )
@@ -80,6 +83,22 @@ def test_rewrite_record():
             record_new = fobj.read()
         assert_record_equal(record_orig, record_new)
         assert_false(exists(sig_fname))
+        # Test rewriting from a pre-built file list, including the signature
+        # but not RECORD
+        with open(sig_fname, "wt") as fobj:
+            fobj.write("something")
+        filenames = [
+            pjoin(root, fname)
+            for root, dirs, files in os.walk("wheel")
+            for fname in files
+            if fname != "RECORD"
+        ]
+        os.unlink(record_fname)
+        rewrite_record("wheel", filenames)
+        with open_readable(record_fname, "rt") as fobj:
+            record_new = fobj.read()
+        assert_record_equal(record_orig, record_new)
+        assert_false(exists(sig_fname))
         # Test error for too many dist-infos
         shutil.copytree(
             pjoin("wheel", dist_info_sdir),
@@ -88,6 +107,35 @@ def test_rewrite_record():
         assert_raises(WheelToolsError, rewrite_record, "wheel")
 
 
+def test_record_hash(tmp_path: Path) -> None:
+    path = tmp_path / "file.txt"
+    path.write_bytes(b"contents")
+    hash, size = _record_hash(str(path))
+    assert hash == "sha256=0bKln76n4gB3r5-Rsn6V6GUGGycL4D_1Oas7c1h4gug"
+    assert size == 8
+    path.write_bytes(b"new contents")
+    assert _record_hash(str(path)) == (
+        "sha256=al9jQkoMh487I7eoXdRTUjYFdi5z9Tb5aPh05X9WXX4",
+        12,
+    )
+
+
+@pytest.mark.skipif(
+    not hasattr(os, "posix_fadvise"), reason="needs posix_fadvise"
+)
+def test_advise_sequential(tmp_path: Path) -> None:
+    path = tmp_path / "file.txt"
+    path.write_bytes(b"contents")
+    with mock.patch("os.posix_fadvise") as posix_fadvise:
+        _record_hash(str(path))
+    posix_fadvise.assert_has_calls(
+        [
+            mock.call(mock.ANY, 0, 0, os.POSIX_FADV_SEQUENTIAL),
+            mock.call(mock.ANY, 0, 0, os.POSIX_FADV_WILLNEED),
+        ]
+    )
+
+
 def test_in_wheel():
     # Test in-wheel context managers
     # Stuff they share
@@ -1,11 +1,17 @@
 """ Tools for getting and setting install names """
 from __future__ import annotations
 
+import contextlib
+import ctypes
+import functools
 import logging
 import os
 import re
+import shutil
 import stat
 import subprocess
+import sys
+import threading
 import time
 import warnings
 import zipfile
@@ -16,9 +22,12 @@ from os.path import join as pjoin
 from pathlib import Path
 from typing import (
     Any,
+    Callable,
     Dict,
     FrozenSet,
+    Iterator,
     List,
+    Mapping,
     Optional,
     Sequence,
     Set,
@@ -27,6 +36,17 @@ from typing import (
     Union,
 )
 
+try:
+    from macholib import mach_o
+    from macholib.MachO import MachO
+except ImportError:  # macholib is optional, otool is used otherwise.
+    MachO = None
+
+try:
+    from zlib_ng import zlib_ng
+except ImportError:  # zlib-ng is optional, see dir2zip.
+    zlib_ng = None  # type: ignore[assignment]
+
 T = TypeVar("T")
 
 logger = logging.getLogger(__name__)
@@ -563,6 +583,82 @@ def get_install_names(filename: str) -> Tuple[str, ...]:
     return tuple(names)
 
 
+_MACHO_LOAD_DYLIB_COMMANDS = (
+    frozenset()
+    if MachO is None
+    else frozenset(
+        [
+            mach_o.LC_LOAD_DYLIB,
+            mach_o.LC_LOAD_WEAK_DYLIB,
+            mach_o.LC_REEXPORT_DYLIB,
+            mach_o.LC_LAZY_LOAD_DYLIB,
+            mach_o.LC_LOAD_UPWARD_DYLIB,
+        ]
+    )
+)
+"""Load commands listed by ``otool -L``, excluding ``LC_ID_DYLIB``."""
+
+
+def _get_install_names_rpaths_macholib(
+    filename: str,
+) -> Optional[Tuple[Tuple[str, ...], Tuple[str, ...]]]:
+    """Return install names and rpaths from `filename` using ``macholib``
+
+    This reads the Mach-O load commands in-process with a single parse,
+    without running ``otool``.  The results match :func:`get_install_names`
+    and :func:`get_rpaths`.
+
+    Parameters
+    ----------
+    filename : str
+        filename of library
+
+    Returns
+    -------
+    install_names_rpaths : None or tuple
+        ``(install_names, rpaths)`` tuple of the install names and rpaths of
+        library `filename`, or None if ``macholib`` is not installed or could
+        not parse `filename`.  The caller should fall back to
+        :func:`get_install_names` and :func:`get_rpaths` in that case.
+
+    Raises
+    ------
+    NotImplementedError
+        If ``filename`` has different install names or rpaths
+        per-architecture.
+    """
+    if MachO is None:
+        return None
+    if not _is_macho_file(filename):
+        return (), ()
+    try:
+        macho = MachO(filename)
+    except Exception:
+        logger.debug("macholib could not parse %s", filename, exc_info=True)
+        return None
+    if not macho.headers:
+        return (), ()
+    names_data: Dict[str, List[Tuple[str, int, int]]] = {}
+    rpaths_data: Dict[str, List[str]] = {}
+    for index, header in enumerate(macho.headers):
+        arch_names = names_data[str(index)] = []
+        arch_rpaths = rpaths_data[str(index)] = []
+        for load_cmd, cmd, data in header.commands:
+            if load_cmd.cmd in _MACHO_LOAD_DYLIB_COMMANDS:
+                arch_names.append(
+                    (
+                        os.fsdecode(data.split(b"\0", 1)[0]),
+                        cmd.compatibility_version,
+                        cmd.current_version,
+                    )
+                )
+            elif load_cmd.cmd == mach_o.LC_RPATH:
+                arch_rpaths.append(os.fsdecode(data.split(b"\0", 1)[0]))
+    names = _check_ignore_archs(names_data)
+    rpaths = _check_ignore_archs(rpaths_data)
+    return tuple(name for name, _, _ in names), tuple(rpaths)
+
+
 def get_install_id(filename: str) -> Optional[str]:
     """Return install id from library named in `filename`
 
@@ -645,14 +741,47 @@ def set_install_name(
     ad_hoc_sign : {True, False}, optional
         If True, sign library with ad-hoc signature
     """
+    set_install_names(filename, {oldname: newname}, ad_hoc_sign)
+
+
+@ensure_writable
+def set_install_names(
+    filename: str, changes: Mapping[str, str], ad_hoc_sign: bool = True
+) -> None:
+    """Set several install names in library filename at once
+
+    All install names are changed by a single ``install_name_tool`` call, and
+    the library is signed at most once.
+
+    Parameters
+    ----------
+    filename : str
+        filename of library
+    changes : mapping
+        Mapping with (key, value) pairs of (``oldname``, ``newname``), where
+        ``oldname`` is a current install name in library and ``newname`` is
+        its replacement.
+    ad_hoc_sign : {True, False}, optional
+        If True, sign library with ad-hoc signature
+
+    Raises
+    ------
+    InstallNameError
+        If any ``oldname`` is not an install name of library.
+    """
+    if not changes:
+        return
     names = get_install_names(filename)
-    if oldname not in names:
-        raise InstallNameError(
-            "{0} not in install names for {1}".format(oldname, filename)
-        )
-    _run(
-        ["install_name_tool", "-change", oldname, newname, filename], check=True
-    )
+    for oldname in changes:
+        if oldname not in names:
+            raise InstallNameError(
+                "{0} not in install names for {1}".format(oldname, filename)
+            )
+    cmd = ["install_name_tool"]
+    for oldname, newname in changes.items():
+        cmd += ["-change", oldname, newname]
+    cmd.append(filename)
+    _run(cmd, check=True)
     if ad_hoc_sign:
         # ad hoc signature is represented by a dash
         # https://developer.apple.com/documentation/security/seccodesignatureflags/kseccodesignatureadhoc
@@ -929,6 +1058,41 @@ def _get_zip_datetime(
     return date_time
 
 
+_zipfile_zlib_lock = threading.Lock()
+
+
+@contextlib.contextmanager
+def _zipfile_zlib_ng() -> Iterator[None]:
+    """Make :mod:`zipfile` deflate with ``zlib-ng`` within this context
+
+    ``zlib_ng.zlib_ng`` is a faster drop-in replacement for :mod:`zlib`,
+    using SIMD instructions where available, including carry-less multiply
+    (PCLMULQDQ / PMULL) for CRC-32.  :mod:`zipfile` has no option to choose
+    its compressor or checksum, so its ``zlib`` module and ``crc32`` function
+    are swapped while the context is active, which affects all threads.
+
+    Raises
+    ------
+    ImportError
+        If ``zlib-ng`` is not installed.
+    """
+    if zlib_ng is None:
+        raise ImportError(
+            "zlib-ng is not installed, install it with"
+            " `pip install delocate[zlib-ng]`"
+        )
+    with _zipfile_zlib_lock:
+        orig_zlib = zipfile.zlib  # type: ignore[attr-defined]
+        orig_crc32 = zipfile.crc32  # type: ignore[attr-defined]
+        zipfile.zlib = zlib_ng  # type: ignore[attr-defined]
+        zipfile.crc32 = zlib_ng.crc32  # type: ignore[attr-defined]
+        try:
+            yield
+        finally:
+            zipfile.zlib = orig_zlib  # type: ignore[attr-defined]
+            zipfile.crc32 = orig_crc32  # type: ignore[attr-defined]
+
+
 def dir2zip(
     in_dir: str | PathLike[str],
     zip_fname: str | PathLike[str],
@@ -936,6 +1100,7 @@ def dir2zip(
     compression: int = zipfile.ZIP_DEFLATED,
     compress_level: int = -1,
     date_time: Optional[_DateTuple] = None,
+    use_zlib_ng: Optional[bool] = None,
 ) -> None:
     """Make a zip file `zip_fname` with contents of directory `in_dir`
 
@@ -955,9 +1120,25 @@ def dir2zip(
         The compression level used for this archive.
     date_time : tuple of int, optional, keyword-only
         Datetime tuple ``(Y, m, d, H, M, S)`` for all recorded entries.
+    use_zlib_ng : None or bool, optional, keyword-only
+        If True, deflate and checksum members with ``zlib-ng``, which must be
+        installed.  If None, ``zlib-ng`` is only used when the
+        ``DELOCATE_ZLIB_NG`` environment variable is ``1``.
+
+    Notes
+    -----
+    ``zlib-ng`` compresses faster than :mod:`zlib` but writes different
+    deflate streams, so archives made with it are not byte-for-byte identical
+    to the default ones, even with the same `date_time`.  While it is in use,
+    :mod:`zipfile` deflates with ``zlib-ng`` for every thread of the process.
     """
     date_time = _get_zip_datetime(date_time)
-    with zipfile.ZipFile(
+    if use_zlib_ng is None:
+        use_zlib_ng = os.environ.get("DELOCATE_ZLIB_NG") == "1"
+    zlib_context = (
+        _zipfile_zlib_ng() if use_zlib_ng else contextlib.nullcontext()
+    )
+    with zlib_context, zipfile.ZipFile(
         zip_fname, "w", compression=compression, compresslevel=compress_level
     ) as zip:
         for root, dirs, files in os.walk(in_dir):
@@ -982,6 +1163,53 @@ def dir2zip(
                 )
 
 
+def _walk_files(top: str) -> Iterator[str]:
+    """Yield the path of each file in the tree of directory `top`
+
+    Yields the same paths in the same order as the file names from
+    ``os.walk(top)``, but uses the file types cached by ``os.scandir`` instead
+    of rebuilding and checking each path.
+
+    Parameters
+    ----------
+    top : str
+        Root directory of the tree to walk.
+
+    Yields
+    ------
+    path : str
+        Path of a file under `top`, prefixed by `top`.  Symlinks to
+        directories are not followed.
+    """
+    for entry in _walk_file_entries(top):
+        yield entry.path
+
+
+def _walk_file_entries(top: str) -> Iterator[os.DirEntry[str]]:
+    """Yield the ``os.DirEntry`` of each file in the tree of directory `top`
+
+    See :func:`_walk_files`.  Only real directories are descended into, so
+    every directory between `top` and a yielded entry is not a symlink.
+    """
+    try:
+        scandir_it = os.scandir(top)
+    except OSError:
+        return  # Unreadable directories are skipped like os.walk does.
+    subdirs = []
+    with scandir_it:
+        for entry in scandir_it:
+            try:
+                is_dir = entry.is_dir()
+            except OSError:
+                is_dir = False
+            if not is_dir:
+                yield entry
+            elif not entry.is_symlink():
+                subdirs.append(entry.path)
+    for subdir in subdirs:
+        yield from _walk_file_entries(subdir)
+
+
 def find_package_dirs(root_path: str) -> Set[str]:
     """Find python package directories in directory `root_path`
 
@@ -1004,6 +1232,92 @@ def find_package_dirs(root_path: str) -> Set[str]:
     return package_sdirs
 
 
+def _copy_file(src: str, dst: str) -> None:
+    """Copy data and permission bits of file `src` to file `dst`
+
+    Equivalent to :func:`shutil.copy` with a file destination, but lets the
+    filesystem share or copy the data itself where possible: ``clonefile`` on
+    macOS (copy-on-write on APFS) and ``os.copy_file_range`` on Linux
+    (reflinks on Btrfs and XFS, server-side copies on NFS).  Falls back to
+    :func:`shutil.copy` when these are unavailable or fail.
+
+    Unlike :func:`shutil.copy`, a clone on macOS also keeps the extended
+    attributes and ACLs of `src`.  Its ownership and modification time are
+    set as for a new file, as with :func:`shutil.copy`.
+
+    Parameters
+    ----------
+    src : str
+        filename to copy from
+    dst : str
+        filename to copy to
+    """
+    if sys.platform == "darwin" and _clonefile(src, dst):
+        return
+    if sys.platform == "linux" and _copy_file_range(src, dst):
+        shutil.copymode(src, dst)
+        return
+    shutil.copy(src, dst)
+
+
+@functools.lru_cache(maxsize=None)
+def _get_clonefile() -> Optional[Callable[[bytes, bytes, int], int]]:
+    """Return the ``clonefile`` function from libSystem, if available."""
+    try:
+        clonefile = ctypes.CDLL(None, use_errno=True).clonefile
+    except (AttributeError, OSError):
+        return None  # macOS < 10.12
+    clonefile.argtypes = [ctypes.c_char_p, ctypes.c_char_p, ctypes.c_uint32]
+    clonefile.restype = ctypes.c_int
+    return clonefile
+
+
+_CLONE_NOOWNERCOPY = 0x0002
+"""``clonefile`` flag to give the clone the ownership of a new file."""
+
+
+def _clonefile(src: str, dst: str) -> bool:
+    """Clone `src` to the new file `dst`, return True on success.
+
+    Fails when `dst` exists or is on another volume, or the filesystem does
+    not support cloning.  The timestamps of `dst` are reset to the current
+    time, as ``clonefile`` copies them from `src`.
+    """
+    clonefile = _get_clonefile()
+    if clonefile is None:
+        return False
+    # Clone the file `src` points to, rather than a symlink.
+    src_b = os.fsencode(os.path.realpath(src))
+    if clonefile(src_b, os.fsencode(dst), _CLONE_NOOWNERCOPY) != 0:
+        return False
+    os.utime(dst)
+    return True
+
+
+def _copy_file_range(src: str, dst: str) -> bool:
+    """Copy the data of `src` to `dst` in the kernel, return True on success.
+
+    On failure the contents of `dst` are undefined.
+    """
+    if not hasattr(os, "copy_file_range"):
+        return False  # Python < 3.8
+    try:
+        with open(src, "rb") as fsrc, open(dst, "wb") as fdst:
+            size = os.fstat(fsrc.fileno()).st_size
+            copied = 0
+            while True:
+                n_copied = os.copy_file_range(
+                    fsrc.fileno(), fdst.fileno(), 1 << 30
+                )
+                if not n_copied:
+                    break
+                copied += n_copied
+    except OSError:
+        return False
+    # Some filesystems return 0 instead of failing, leaving `dst` truncated.
+    return copied == size
+
+
 def cmp_contents(filename1, filename2):
     """Returns True if contents of the files are the same
 
@@ -8,19 +8,21 @@ import csv
 import glob
 import hashlib
 import os
+import struct
 import sys
+from concurrent.futures import ThreadPoolExecutor
 from itertools import product
 from os.path import abspath, basename, dirname, exists, relpath, splitext
 from os.path import join as pjoin
 from os.path import sep as psep
-from typing import Iterable, Optional, Union, overload
+from typing import Iterable, Optional, Tuple, Union, overload
 
 from packaging.utils import parse_wheel_filename
 
 from delocate.pkginfo import read_pkg_info, write_pkg_info
 
 from .tmpdirs import InTemporaryDirectory
-from .tools import dir2zip, open_rw, unique_by_index, zip2dir
+from .tools import _walk_files, dir2zip, open_rw, unique_by_index, zip2dir
 
 
 class WheelToolsError(Exception):
@@ -34,7 +36,9 @@ def _open_for_csv(name, mode):
     return open_rw(name, mode, newline="", encoding="utf-8")
 
 
-def rewrite_record(bdist_dir: str) -> None:
+def rewrite_record(
+    bdist_dir: str, filenames: Optional[Iterable[str]] = None
+) -> None:
     """Rewrite RECORD file with hashes for all files in `wheel_sdir`
 
     Copied from :method:`wheel.bdist_wheel.bdist_wheel.write_record`
@@ -45,6 +49,11 @@ def rewrite_record(bdist_dir: str) -> None:
     ----------
     bdist_dir : str
         Path of unpacked wheel file
+    filenames : None or iterable of str, optional
+        Paths of all files in `bdist_dir`, from an earlier walk of the tree.
+        If None, `bdist_dir` is walked to find the files.  RECORD is always
+        recorded and the RECORD signature never is, whether or not they are
+        in `filenames`.
     """
     info_dirs = glob.glob(pjoin(bdist_dir, "*.dist-info"))
     if len(info_dirs) != 1:
@@ -56,32 +65,89 @@ def rewrite_record(bdist_dir: str) -> None:
     if exists(sig_path):
         os.unlink(sig_path)
 
-    def walk():
-        for dir, dirs, files in os.walk(bdist_dir):
-            for f in files:
-                yield pjoin(dir, f)
-
     def skip(path):
         """Wheel hashes every possible file."""
         return path == record_relpath
 
+    def record_row(path: str) -> Tuple[str, str, Union[int, str]]:
+        relative_path = relpath(path, bdist_dir)
+        if skip(relative_path):
+            hash = ""
+            size: Union[int, str] = ""
+        else:
+            hash, size = _record_hash(path)
+        return relative_path.replace(psep, "/"), hash, size
+
     with _open_for_csv(record_path, "w+") as record_file:
         writer = csv.writer(record_file)
-        for path in walk():
-            relative_path = relpath(path, bdist_dir)
-            if skip(relative_path):
-                hash = ""
-                size: Union[int, str] = ""
-            else:
-                with open(path, "rb") as f:
-                    data = f.read()
-                digest = hashlib.sha256(data).digest()
-                hash = "sha256=%s" % (
-                    base64.urlsafe_b64encode(digest).decode("ascii").strip("=")
-                )
-                size = len(data)
-            path_for_record = relpath(path, bdist_dir).replace(psep, "/")
-            writer.writerow((path_for_record, hash, size))
+        if filenames is None:
+            paths = list(_walk_files(bdist_dir))
+        else:
+            paths = [path for path in filenames if path != sig_path]
+            if record_path not in paths:
+                paths.append(record_path)
+        # Reading and hashing release the GIL, so files are hashed in parallel.
+        # ``map`` keeps the rows in walk order for a single ``writerows``.
+        with ThreadPoolExecutor(max_workers=os.cpu_count()) as executor:
+            writer.writerows(executor.map(record_row, paths))
+
+
+_HASH_CHUNK_SIZE = 1 << 20
+"""Bytes read per step when hashing files for RECORD."""
+
+_F_RDADVISE = 44
+"""macOS ``fcntl`` command to read ahead a file range, from ``sys/fcntl.h``."""
+
+
+def _advise_sequential(fd: int, size: int) -> None:
+    """Advise the OS that the file `fd` of `size` bytes will be read in full
+
+    This lets the kernel read ahead of the hash, hiding disk latency for files
+    which are not in the page cache.  The advice is only a hint, so failures
+    are ignored.
+    """
+    try:
+        if hasattr(os, "posix_fadvise"):
+            os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_SEQUENTIAL)
+            os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_WILLNEED)
+        elif sys.platform == "darwin":
+            import fcntl
+
+            # struct radvisory {off_t ra_offset; int ra_count;}
+            radvisory = struct.pack("@qi", 0, min(size, 0x7FFFFFFF))
+            fcntl.fcntl(fd, _F_RDADVISE, radvisory)
+    except OSError:
+        pass
+
+
+def _record_hash(path: str) -> Tuple[str, int]:
+    """Return the RECORD hash entry and size in bytes of the file at `path`
+
+    The file is hashed in chunks so that large libraries are never held in
+    memory whole.  ``hashlib.sha256`` is backed by OpenSSL when available,
+    which selects SHA extensions (x86 SHA-NI, ARMv8 crypto) at runtime; large
+    chunks keep the time spent outside of OpenSSL negligible.
+    """
+    with open(path, "rb", buffering=0) as f:
+        size = os.fstat(f.fileno()).st_size
+        _advise_sequential(f.fileno(), size)
+        if sys.version_info >= (3, 11):
+            digest = hashlib.file_digest(f, "sha256").digest()
+        else:
+            sha256 = hashlib.sha256()
+            # Reuse one buffer rather than allocating each chunk.
+            buffer = bytearray(_HASH_CHUNK_SIZE)
+            view = memoryview(buffer)
+            while True:
+                n_read = f.readinto(buffer)
+                if not n_read:
+                    break
+                sha256.update(view[:n_read])
+            digest = sha256.digest()
+    hash = "sha256=%s" % (
+        base64.urlsafe_b64encode(digest).decode("ascii").strip("=")
+    )
+    return hash, size
 
 
 class InWheel(InTemporaryDirectory):